@@ -2,15 +2,35 @@
 from __future__ import annotations
 
 import argparse
-import json
+import asyncio
 import os
-import re
-import subprocess
+import shutil
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+import orjson
+
+try:
+    # ISA-L (python-isal): deflate SIMD et CRC-32 PCLMUL sur x86; optionnel.
+    from isal import isal_zlib
+except ImportError:
+    isal_zlib = None
+
+API_URL = "https://api.github.com"
+DOWNLOAD_CHUNK = 1024 * 1024
+ZIP_COPY_CHUNK = 4 * 1024 * 1024
+ITEMS_FILE = "manifest.items.jsonl"
+DONE_FILE = ".done"
+ARTIFACT_CONCURRENCY = 5
+API_RATE = 10.0
+API_BURST = 20
+API_MAX_RETRIES = 3
+BLOCKING_WORKERS = 4
 
 
 def utc_now() -> str:
@@ -21,34 +41,155 @@ def ts_compact() -> str:
     return time.strftime("%Y%m%d_%H%M%S", time.gmtime())
 
 
-def run_capture(cmd: List[str], *, cwd: Optional[Path] = None) -> Tuple[int, str]:
-    p = subprocess.run(cmd, cwd=str(cwd) if cwd else None, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    return p.returncode, p.stdout or ""
+async def run_capture(cmd: List[str], *, cwd: Optional[Path] = None, merge_stderr: bool = True) -> Tuple[int, bytes]:
+    # Sortie brute: décodée uniquement là où un str est nécessaire.
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=str(cwd) if cwd else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.DEVNULL,
+    )
+    out, _ = await proc.communicate()
+    return proc.returncode or 0, out or b""
 
 
-def ensure_gh() -> None:
-    rc, out = run_capture(["gh", "--version"])
+async def ensure_gh() -> None:
+    rc, out = await run_capture(["gh", "--version"])
     if rc != 0:
-        raise SystemExit("gh introuvable sur le runner.\n" + out)
+        raise SystemExit("gh introuvable sur le runner.\n" + out.decode("utf-8", "replace"))
+
+
+async def resolve_token() -> str:
+    # GH_TOKEN / GITHUB_TOKEN, sinon un seul appel à gh pour toute la collecte.
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token.strip()
+    await ensure_gh()
+    rc, out = await run_capture(["gh", "auth", "token"], merge_stderr=False)
+    if rc != 0 or not out.strip():
+        raise SystemExit("Aucun token GitHub: définir GH_TOKEN ou exécuter gh auth login.")
+    return out.strip().decode("utf-8", "replace")
+
+
+class TokenBucket:
+    # Débit de départ partagé par toutes les coroutines: `rate` requêtes/s, rafales de `burst`.
+    # Après une limite secondaire de GitHub, plus aucune requête ne part avant l'échéance
+    # imposée, puis le débit est divisé par deux pendant un temps.
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.slow_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    # Verrou conservé pendant l'attente: les autres coroutines attendent aussi.
+                    await asyncio.sleep(self.blocked_until - now)
+                    self.tokens, self.updated = 1.0, time.monotonic()
+                    continue
+                rate = self.rate / 2 if now < self.slow_until else self.rate
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / rate)
+
+    def back_off(self, delay: float, slow: float = 60.0) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.slow_until = self.blocked_until + slow
+
+
+def retry_delay(r: httpx.Response) -> Optional[float]:
+    # Délai imposé par GitHub (429, ou 403 de limite de débit), None sinon.
+    if r.status_code not in (403, 429):
+        return None
+    if r.headers.get("retry-after", "").isdigit():
+        return float(r.headers["retry-after"])
+    if r.headers.get("x-ratelimit-remaining") == "0" and r.headers.get("x-ratelimit-reset", "").isdigit():
+        return max(float(r.headers["x-ratelimit-reset"]) - time.time(), 1.0)
+    return 60.0 if r.status_code == 429 else None
+
+
+class ThrottledTransport(httpx.AsyncHTTPTransport):
+    # Chaque requête (redirections et flux compris) passe par le TokenBucket.
+
+    def __init__(self, bucket: TokenBucket, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.bucket = bucket
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # Tentative initiale + API_MAX_RETRIES reprises; la dernière réponse est rendue telle quelle.
+        for attempt in range(API_MAX_RETRIES + 1):
+            await self.bucket.acquire()
+            r = await super().handle_async_request(request)
+            delay = retry_delay(r)
+            if delay is None or attempt == API_MAX_RETRIES:
+                break
+            await r.aclose()
+            self.bucket.back_off(delay)
+        return r
+
+
+def make_client(token: str, bucket: TokenBucket) -> httpx.AsyncClient:
+    # Un seul client (keep-alive, HTTP/2) partagé par tous les repos.
+    return httpx.AsyncClient(
+        base_url=API_URL,
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        },
+        transport=ThrottledTransport(bucket, http2=True),
+        timeout=30,
+    )
+
+
+def http_error(exc: Exception) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        r = exc.response
+        try:
+            msg = orjson.loads(r.content).get("message") or r.text
+        except Exception:
+            msg = r.reason_phrase
+        return f"HTTP {r.status_code}: {msg}"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def write_bytes(path: Path, data: bytes) -> None:
+    # Écriture directe sur le descripteur: ni couche texte ni tampon Python.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
 
 
 def write_json(path: Path, obj: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_bytes(path, orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
 
 def write_text(path: Path, content: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
+    write_bytes(path, content.encode("utf-8"))
 
 
 def read_repos_file(path: Path) -> List[str]:
     repos: List[str] = []
-    for line in path.read_text(encoding="utf-8").splitlines():
+    for line in path.read_bytes().splitlines():
         s = line.strip()
-        if not s or s.startswith("#"):
+        if not s or s.startswith(b"#"):
             continue
-        repos.append(s)
+        repos.append(s.decode("utf-8"))
     return repos
 
 
@@ -63,140 +204,555 @@ class RunInfo:
     html_url: Optional[str]
 
 
-def gh_list_runs(repo: str, workflow: str = "", limit: int = 30) -> Tuple[bool, str, List[RunInfo]]:
-    cmd = [
-        "gh", "run", "list",
-        "-R", repo,
-        "--limit", str(limit),
-        "--json", "databaseId,status,conclusion,createdAt,displayTitle,workflowName,htmlUrl",
-    ]
-    if workflow:
-        cmd += ["--workflow", workflow]
+async def resolve_workflow(client: httpx.AsyncClient, repo: str, workflow: str) -> Optional[str]:
+    # Comme gh run list --workflow: id, fichier ou nom (résolu en id).
+    if not workflow or workflow.isdigit() or workflow.endswith((".yml", ".yaml")):
+        return Path(workflow).name
+    r = await client.get(f"/repos/{repo}/actions/workflows", params={"per_page": 100})
+    r.raise_for_status()
+    for w in orjson.loads(r.content).get("workflows") or []:
+        if w.get("name") == workflow:
+            return str(w["id"])
+    return None
+
+
+def run_from_rest(r: Dict[str, Any]) -> RunInfo:
+    return RunInfo(
+        database_id=int(r.get("id")),
+        status=str(r.get("status") or ""),
+        conclusion=r.get("conclusion"),
+        created_at=str(r.get("created_at") or ""),
+        display_title=r.get("display_title"),
+        workflow_name=r.get("name"),
+        html_url=r.get("html_url"),
+    )
+
+
+async def api_list_runs(
+    client: httpx.AsyncClient, repo: str, workflow: str = "", limit: int = 30, branch: str = ""
+) -> Tuple[bool, str, Iterator[RunInfo]]:
+    try:
+        wf = await resolve_workflow(client, repo, workflow)
+        if wf is None:
+            return False, f"workflow_not_found:{workflow}", iter(())
+        url = f"/repos/{repo}/actions/workflows/{wf}/runs" if wf else f"/repos/{repo}/actions/runs"
+        # Toutes branches, comme gh run list, sauf --branch explicite.
+        scope = {"branch": branch} if branch else {}
+        # Filtre côté serveur: seul le dernier run réussi transite.
+        r = await client.get(url, params={**scope, "status": "success", "per_page": 1})
+        r.raise_for_status()
+        data = orjson.loads(r.content)
+        if not data.get("workflow_runs"):
+            # Aucun succès: on inspecte les derniers runs pour pick_run.
+            r = await client.get(url, params={**scope, "per_page": min(max(limit, 1), 100)})
+            r.raise_for_status()
+            data = orjson.loads(r.content)
+    except httpx.HTTPError as exc:
+        return False, http_error(exc), iter(())
+    except ValueError:
+        return False, "json_parse_failed", iter(())
+
+    # RunInfo construits à la demande: pick_run s'arrête au premier succès.
+    return True, "ok", (run_from_rest(r) for r in data.get("workflow_runs") or [])
+
+
+async def api_get_run(client: httpx.AsyncClient, repo: str, run_id: int) -> RunInfo:
+    r = await client.get(f"/repos/{repo}/actions/runs/{run_id}")
+    r.raise_for_status()
+    return run_from_rest(orjson.loads(r.content))
+
+
+GRAPHQL_BATCH = 20
+
+_BRANCH_RUNS_FRAGMENT = """
+fragment BranchRuns on Repository {
+  ref(qualifiedName: $branch) {
+    target {
+      ... on Commit {
+        checkSuites(first: $limit) {
+          nodes {
+            status
+            conclusion
+            workflowRun {
+              databaseId
+              createdAt
+              url
+              workflow { name }
+              file { path }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def build_runs_query(n: int) -> str:
+    # Un alias repoN par repo: un seul appel GraphQL pour tout le lot.
+    params = ", ".join(["$limit: Int!", "$branch: String!"] + [f"$owner{i}: String!, $name{i}: String!" for i in range(n)])
+    blocks = "\n".join(f"  repo{i}: repository(owner: $owner{i}, name: $name{i}) {{ ...BranchRuns }}" for i in range(n))
+    return f"query({params}) {{\n{blocks}\n}}\n{_BRANCH_RUNS_FRAGMENT}"
 
-    rc, out = run_capture(cmd)
-    if rc != 0:
-        return False, out.strip(), []
 
-    try:
-        data = json.loads(out or "[]")
-    except Exception:
-        return False, "json_parse_failed", []
+def workflow_matches(workflow: str, name: Optional[str], path: Optional[str]) -> bool:
+    # Même sémantique que gh run list --workflow: nom du workflow ou fichier.
+    if not workflow:
+        return True
+    return workflow in (name, path, Path(path).name if path else None)
 
+
+def runs_from_graphql(repo_data: Optional[Dict[str, Any]], workflow: str) -> List[RunInfo]:
+    # Candidats seulement: GraphQL n'expose pas le titre du run, le run retenu est relu via REST.
+    commit = ((repo_data or {}).get("ref") or {}).get("target") or {}
+    suites = ((commit.get("checkSuites") or {}).get("nodes")) or []
     runs: List[RunInfo] = []
-    for r in data:
+    for cs in suites:
+        wr = (cs or {}).get("workflowRun")
+        if not wr or wr.get("databaseId") is None:
+            continue
+        wf_name = (wr.get("workflow") or {}).get("name")
+        if not workflow_matches(workflow, wf_name, (wr.get("file") or {}).get("path")):
+            continue
         runs.append(
             RunInfo(
-                database_id=int(r.get("databaseId")),
-                status=str(r.get("status") or ""),
-                conclusion=r.get("conclusion"),
-                created_at=str(r.get("createdAt") or ""),
-                display_title=r.get("displayTitle"),
-                workflow_name=r.get("workflowName"),
-                html_url=r.get("htmlUrl"),
+                database_id=int(wr["databaseId"]),
+                status=str(cs.get("status") or "").lower(),
+                conclusion=(cs.get("conclusion") or "").lower() or None,
+                created_at=str(wr.get("createdAt") or ""),
+                display_title=None,
+                workflow_name=wf_name,
+                html_url=wr.get("url"),
             )
         )
-    return True, "ok", runs
+    # Plus récent d'abord, comme gh run list.
+    runs.sort(key=lambda r: r.created_at, reverse=True)
+    return runs
+
+
+async def api_list_runs_batch(
+    client: httpx.AsyncClient, repos: List[str], branch: str, workflow: str = "", limit: int = 30
+) -> Dict[str, List[RunInfo]]:
+    # Runs du dernier commit de `branch` pour chaque repo, en une requête GraphQL pour tout
+    # le lot. Les repos absents du résultat (erreur, branche inconnue) passent par api_list_runs.
+    batch = [r for r in repos if r.count("/") == 1]
+    if not batch or not branch:
+        return {}
+    variables: Dict[str, Any] = {"limit": min(max(limit, 1), 100), "branch": f"refs/heads/{branch}"}
+    for i, repo in enumerate(batch):
+        variables[f"owner{i}"], variables[f"name{i}"] = repo.split("/")
+
+    # Un alias en erreur n'invalide pas la réponse: on exploite les données partielles.
+    try:
+        body = orjson.dumps({"query": build_runs_query(len(batch)), "variables": variables})
+        r = await client.post("/graphql", content=body, headers={"Content-Type": "application/json"})
+        r.raise_for_status()
+        data = orjson.loads(r.content).get("data") or {}
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+    found: Dict[str, List[RunInfo]] = {}
+    for i, repo in enumerate(batch):
+        repo_data = data.get(f"repo{i}")
+        if (repo_data or {}).get("ref"):
+            found[repo] = runs_from_graphql(repo_data, workflow)
+    return found
+
+
+def pick_run(runs: Iterable[RunInfo]) -> Optional[RunInfo]:
+    # Priorité: completed + success, sinon latest completed, sinon latest.
+    # Un seul passage, arrêt au premier succès.
+    first: Optional[RunInfo] = None
+    completed: Optional[RunInfo] = None
+    for r in runs:
+        if r.status == "completed":
+            if (r.conclusion or "").lower() == "success":
+                return r
+            if completed is None:
+                completed = r
+        if first is None:
+            first = r
+    return completed or first
+
+
+async def list_artifacts(client: httpx.AsyncClient, repo: str, run_id: int) -> List[Dict[str, Any]]:
+    artifacts: List[Dict[str, Any]] = []
+    page = 1
+    while True:
+        r = await client.get(f"/repos/{repo}/actions/runs/{run_id}/artifacts", params={"per_page": 100, "page": page})
+        r.raise_for_status()
+        chunk = orjson.loads(r.content).get("artifacts") or []
+        artifacts += [a for a in chunk if not a.get("expired")]
+        if len(chunk) < 100:
+            return artifacts
+        page += 1
+
+
+def extract_zip(zip_path: Path, dest: Path) -> None:
+    with zipfile.ZipFile(zip_path) as z:
+        z.extractall(dest)
+    zip_path.unlink()
+
+
+def artifact_dirname(name: str) -> str:
+    # Nom brut, comme gh run download. GitHub interdit déjà les séparateurs; on refuse
+    # seulement ce qui sortirait du dossier de destination.
+    if name in ("", ".", "..") or "/" in name or "\\" in name or "\0" in name:
+        raise ValueError(f"nom d'artefact invalide: {name!r}")
+    return name
+
+
+async def download_artifact(client: httpx.AsyncClient, artifact: Dict[str, Any], dest: Path) -> str:
+    name = artifact_dirname(str(artifact.get("name") or ""))
+    zip_path = dest / f"{name}.zip"
+    size = 0
+    try:
+        async with client.stream("GET", artifact["archive_download_url"], follow_redirects=True) as r:
+            r.raise_for_status()
+            with zip_path.open("wb") as fh:
+                async for chunk in r.aiter_bytes(DOWNLOAD_CHUNK):
+                    fh.write(chunk)
+                    size += len(chunk)
+        await asyncio.to_thread(extract_zip, zip_path, dest / name)
+    except BaseException:
+        # Archive partielle ou invalide: elle ne doit finir ni dans .done ni dans le bundle.
+        zip_path.unlink(missing_ok=True)
+        raise
+    return f"downloaded {name} ({size} bytes)"
+
+
+async def api_download_run(client: httpx.AsyncClient, repo: str, run_id: int, dest: Path) -> Tuple[bool, str]:
+    dest.mkdir(parents=True, exist_ok=True)
+    try:
+        artifacts = await list_artifacts(client, repo, run_id)
+    except Exception as exc:
+        return False, http_error(exc)
+    if not artifacts:
+        return False, "no valid artifacts found to download"
+
+    # Artefacts d'un même run téléchargés en parallèle (matrices de build).
+    sem = asyncio.Semaphore(ARTIFACT_CONCURRENCY)
+
+    async def fetch(artifact: Dict[str, Any]) -> str:
+        async with sem:
+            return await download_artifact(client, artifact, dest)
+
+    results = await asyncio.gather(*(fetch(a) for a in artifacts), return_exceptions=True)
+    ok = True
+    lines: List[str] = []
+    for a, res in zip(artifacts, results):
+        # Un artefact en échec (réseau, zip invalide, disque, réponse incomplète) n'arrête pas les autres.
+        if isinstance(res, Exception):
+            ok = False
+            lines.append(f"{a.get('name')}: {http_error(res)}")
+        elif isinstance(res, BaseException):
+            raise res
+        else:
+            lines.append(res)
+    return ok, "\n".join(lines)
 
 
-def pick_run(runs: List[RunInfo]) -> Optional[RunInfo]:
-    # Priorité: completed + success, sinon latest completed, sinon latest.
-    completed = [r for r in runs if r.status == "completed"]
-    success = [r for r in completed if (r.conclusion or "").lower() == "success"]
-    if success:
-        return success[0]
-    if completed:
-        return completed[0]
-    return runs[0] if runs else None
+# Formats déjà compressés: stockés tels quels dans le bundle.
+STORED_SUFFIXES = frozenset({
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".whl", ".jar",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".pdf",
+})
 
 
-def gh_download_run(repo: str, run_id: int, dest: Path) -> Tuple[bool, str]:
-    dest.mkdir(parents=True, exist_ok=True)
-    cmd = ["gh", "run", "download", str(run_id), "-R", repo, "-D", str(dest)]
-    rc, out = run_capture(cmd)
-    return rc == 0, out.strip()
+def iter_files(d: str) -> Iterator[os.DirEntry]:
+    # Parcours paresseux: pas de liste globale, tri limité à chaque dossier.
+    with os.scandir(d) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    # Type lu depuis readdir (DirEntry), sans stat supplémentaire; liens symboliques ignorés.
+    for e in entries:
+        if e.is_dir(follow_symlinks=False):
+            yield from iter_files(e.path)
+        elif e.is_file(follow_symlinks=False):
+            yield e
+
+
+def use_isal_zlib() -> None:
+    # zipfile lie crc32 à l'import: les deux points d'entrée sont remplacés.
+    if isal_zlib is not None:
+        zipfile.zlib = isal_zlib
+        zipfile.crc32 = isal_zlib.crc32
 
 
 def zip_folder(src_dir: Path, zip_path: Path) -> None:
     if zip_path.exists():
         zip_path.unlink()
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        for p in sorted(src_dir.rglob("*")):
-            if p.is_file():
-                z.write(p, p.relative_to(src_dir.parent))
+    # Chemins relatifs par simple découpe du préfixe commun.
+    prefix_len = len(os.path.join(str(src_dir.parent), ""))
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, strict_timestamps=False) as z:
+        for e in iter_files(str(src_dir)):
+            arcname = e.path[prefix_len:]
+            if os.path.splitext(e.name)[1].lower() in STORED_SUFFIXES:
+                # Copie brute par gros blocs: pas de recompression ni de tampons de 8 Kio.
+                zi = zipfile.ZipInfo.from_file(e.path, arcname, strict_timestamps=False)
+                zi.compress_type = zipfile.ZIP_STORED
+                with open(e.path, "rb") as src, z.open(zi, "w") as dst:
+                    shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK)
+            else:
+                z.write(e.path, arcname, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
 
 
 def sanitize_repo(repo: str) -> str:
     return repo.replace("/", "__")
 
 
+def snapshot_files(d: Path) -> Dict[str, List[int]]:
+    # Empreinte légère d'un dossier: taille et mtime de chaque fichier.
+    out: Dict[str, List[int]] = {}
+    prefix_len = len(os.path.join(str(d), ""))
+    for e in iter_files(str(d)):
+        st = e.stat(follow_symlinks=False)
+        out[e.path[prefix_len:]] = [st.st_size, st.st_mtime_ns]
+    return out
+
+
+def read_done(repo_dir: Path) -> Dict[str, Any]:
+    try:
+        done = orjson.loads((repo_dir / DONE_FILE).read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return done if isinstance(done, dict) else {}
+
+
+def done_filters(done: Dict[str, Any]) -> List[str]:
+    # Filtres --workflow qui ont sélectionné ce run (un même run peut servir plusieurs filtres).
+    filters = done.get("workflow_filters")
+    return [str(f) for f in filters] if isinstance(filters, list) else []
+
+
+def filter_key(workflow: str, branch: str = "") -> str:
+    # Clé enregistrée dans .done: un run choisi pour une branche ne sert pas le filtre sans branche.
+    return f"{workflow}@{branch}" if branch else workflow
+
+
+def is_cached(repo_dir: Path) -> bool:
+    # Un run_id est immuable: artefacts déjà complets et intacts -> pas de nouveau téléchargement.
+    files = read_done(repo_dir).get("files") or {}
+    try:
+        return bool(files) and snapshot_files(repo_dir / "artifacts") == files
+    except OSError:
+        return False
+
+
+def prune_stale_runs(repo_root: Path, keep: str, key: str) -> List[str]:
+    # Synchronisation incrémentale: tout ancien run_* est supprimé, sauf s'il sert encore un
+    # autre filtre --workflow d'après son .done. Un run sans .done lisible est récupéré.
+    removed: List[str] = []
+    with os.scandir(repo_root) as it:
+        candidates = [e for e in it if e.name.startswith("run_") and e.name != keep and e.is_dir(follow_symlinks=False)]
+    for e in candidates:
+        run_dir = Path(e.path)
+        done = read_done(run_dir)
+        owners = done_filters(done)
+        others = [f for f in owners if f != key]
+        if others:
+            # Encore utilisé par un autre filtre: on ne retire que celui-ci.
+            if others != owners:
+                done["workflow_filters"] = others
+                write_json(run_dir / DONE_FILE, done)
+            continue
+        shutil.rmtree(run_dir)
+        removed.append(e.name)
+    return removed
+
+
+@dataclass
+class RepoPlan:
+    # Calculé une fois par repo, puis partagé par toutes les étapes.
+    repo: str
+    name: str
+    root: Path
+
+
+def build_plan(repos: List[str], outdir: Path) -> List[RepoPlan]:
+    plan: List[RepoPlan] = []
+    for repo in repos:
+        name = sanitize_repo(repo)
+        plan.append(RepoPlan(repo=repo, name=name, root=outdir / name))
+    return plan
+
+
+def is_success(run: Optional[RunInfo]) -> bool:
+    return run is not None and run.status == "completed" and (run.conclusion or "").lower() == "success"
+
+
+async def process_repo(
+    client: httpx.AsyncClient,
+    entry: RepoPlan,
+    workflow: str,
+    limit: int,
+    branch: str = "",
+    prefetched: Optional[List[RunInfo]] = None,
+) -> Dict[str, Any]:
+    # Pipeline d'un repo: list -> pick_run -> download.
+    repo = entry.repo
+    item: Dict[str, Any] = {
+        "repo": repo,
+        "workflow_filter": workflow,
+        "selected_run": None,
+        "download_ok": False,
+        "cached": False,
+        "error": None,
+    }
+
+    # Avec --branch, le lot GraphQL fournit les candidats du dernier commit; le run retenu est
+    # relu via REST pour des métadonnées identiques à celles de la liste REST.
+    selected = pick_run(prefetched or [])
+    if is_success(selected):
+        try:
+            selected = await api_get_run(client, repo, selected.database_id)
+        except (httpx.HTTPError, ValueError):
+            selected = None
+    if not is_success(selected):
+        ok, msg, runs = await api_list_runs(client, repo, workflow=workflow, limit=limit, branch=branch)
+        if not ok:
+            item["error"] = f"run_list_failed:{msg}"
+            return item
+        selected = pick_run(runs)
+
+    if not selected:
+        item["error"] = "no_runs_found"
+        return item
+
+    item["selected_run"] = {
+        "databaseId": selected.database_id,
+        "status": selected.status,
+        "conclusion": selected.conclusion,
+        "createdAt": selected.created_at,
+        "workflowName": selected.workflow_name,
+        "displayTitle": selected.display_title,
+        "htmlUrl": selected.html_url,
+    }
+
+    repo_dir = entry.root / f"run_{selected.database_id}"
+    repo_dir.mkdir(parents=True, exist_ok=True)
+    item["run_dir"] = f"{entry.name}/{repo_dir.name}"
+
+    write_json(repo_dir / "run_meta.json", item["selected_run"])
+    key = filter_key(workflow, branch)
+    previous = read_done(repo_dir)
+    filters = done_filters(previous)
+    if key not in filters:
+        filters.append(key)
+    if await asyncio.to_thread(is_cached, repo_dir):
+        item["download_ok"] = True
+        item["cached"] = True
+        if previous.get("workflow_filters") != filters:
+            write_json(repo_dir / DONE_FILE, {**previous, "workflow_filters": filters})
+        await asyncio.to_thread(prune_stale_runs, entry.root, repo_dir.name, key)
+        return item
+
+    # .done sans "files" dès le départ: le run n'est pas en cache, mais un échec reste rattaché
+    # à ce filtre et sera récupéré par le prochain prune_stale_runs du même filtre.
+    write_json(repo_dir / DONE_FILE, {"run_id": selected.database_id, "workflow_filters": filters})
+    # Téléchargement dans un dossier vide: rien d'une tentative précédente n'est conservé.
+    if (repo_dir / "artifacts").exists():
+        await asyncio.to_thread(shutil.rmtree, repo_dir / "artifacts")
+    ok_dl, out_dl = await api_download_run(client, repo, selected.database_id, repo_dir / "artifacts")
+    write_text(repo_dir / "download.log", out_dl + "\n")
+
+    item["download_ok"] = bool(ok_dl)
+    if not ok_dl:
+        item["error"] = f"download_failed:{out_dl[:2000]}"
+    else:
+        item["error"] = None
+        files = await asyncio.to_thread(snapshot_files, repo_dir / "artifacts")
+        done = {"run_id": selected.database_id, "workflow_filters": filters, "files": files}
+        write_json(repo_dir / DONE_FILE, done)
+        # Les anciens runs ne sont retirés qu'une fois le nouveau complet.
+        await asyncio.to_thread(prune_stale_runs, entry.root, repo_dir.name, key)
+    return item
+
+
+async def collect(
+    token: str,
+    plan: List[RepoPlan],
+    workflow: str,
+    limit: int,
+    concurrency: int,
+    items_fh: BinaryIO,
+    branch: str = "",
+) -> None:
+    # Appels API en parallèle, bornés par un sémaphore (limites secondaires de l'API GitHub).
+    sem = asyncio.Semaphore(max(1, concurrency))
+    bucket = TokenBucket(API_RATE, API_BURST)
+    # Pool persistant et borné pour le travail bloquant (extraction zip, parcours disque)
+    # lancé via asyncio.to_thread; asyncio.run le ferme en sortie.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="collect")
+    )
+
+    async with make_client(token, bucket) as client:
+
+        async def list_batch(batch: List[str]) -> Dict[str, List[RunInfo]]:
+            async with sem:
+                return await api_list_runs_batch(client, batch, branch, workflow=workflow, limit=limit)
+
+        # Lot GraphQL seulement avec --branch: sans branche, la sélection porte sur toutes les
+        # branches (comme gh run list) et passe par l'API REST.
+        prefetched: Dict[str, List[RunInfo]] = {}
+        if branch:
+            repos = [e.repo for e in plan]
+            batches = [repos[i:i + GRAPHQL_BATCH] for i in range(0, len(repos), GRAPHQL_BATCH)]
+            for found in await asyncio.gather(*(list_batch(b) for b in batches)):
+                prefetched.update(found)
+
+        async def with_sem(entry: RepoPlan) -> None:
+            async with sem:
+                try:
+                    item = await process_repo(client, entry, workflow, limit, branch, prefetched.get(entry.repo))
+                except Exception as exc:
+                    # Un repo en échec devient un item en erreur, sans interrompre les autres.
+                    item = {
+                        "repo": entry.repo,
+                        "workflow_filter": workflow,
+                        "selected_run": None,
+                        "download_ok": False,
+                        "cached": False,
+                        "error": f"collect_failed:{http_error(exc)[:2000]}",
+                    }
+            item["utc_done"] = utc_now()
+            # Une ligne par repo dès qu'il est traité: rien n'est perdu si la collecte s'interrompt.
+            items_fh.write(orjson.dumps(item) + b"\n")
+            items_fh.flush()
+
+        await asyncio.gather(*(with_sem(e) for e in plan))
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="Collecte transverse des artefacts GitHub Actions (multi-repos).")
     ap.add_argument("--repos-file", required=True, help="Fichier repos.txt (owner/repo par ligne).")
     ap.add_argument("--outdir", default="_collected_reports", help="Dossier de sortie.")
     ap.add_argument("--workflow", default="", help="Filtre optionnel de workflow (nom ou fichier).")
+    ap.add_argument("--branch", default="", help="Limiter la sélection aux runs de cette branche (défaut: toutes).")
     ap.add_argument("--zip", action="store_true", help="Créer un bundle zip final.")
-    ap.add_argument("--limit", type=int, default=30, help="Nombre de runs inspectés par repo.")
+    ap.add_argument("--limit", type=int, default=30, help="Nombre de runs inspectés par repo sans run réussi.")
+    ap.add_argument("--concurrency", type=int, default=8, help="Nombre maximal de repos traités en parallèle.")
     args = ap.parse_args()
 
-    ensure_gh()
+    use_isal_zlib()
+    token = asyncio.run(resolve_token())
 
     repos_path = Path(args.repos_file).resolve()
     outdir = Path(args.outdir).resolve()
     outdir.mkdir(parents=True, exist_ok=True)
 
-    repos = read_repos_file(repos_path)
+    plan = build_plan(read_repos_file(repos_path), outdir)
     manifest: Dict[str, Any] = {
         "utc_start": utc_now(),
         "repos_file": str(repos_path),
         "workflow_filter": args.workflow,
-        "items": [],
+        "branch_filter": args.branch,
+        "items_file": ITEMS_FILE,
     }
 
-    for repo in repos:
-        item: Dict[str, Any] = {
-            "repo": repo,
-            "workflow_filter": args.workflow,
-            "selected_run": None,
-            "download_ok": False,
-            "error": None,
-        }
-
-        ok, msg, runs = gh_list_runs(repo, workflow=args.workflow, limit=args.limit)
-        if not ok:
-            item["error"] = f"run_list_failed:{msg}"
-            manifest["items"].append(item)
-            continue
-
-        selected = pick_run(runs)
-        if not selected:
-            item["error"] = "no_runs_found"
-            manifest["items"].append(item)
-            continue
-
-        item["selected_run"] = {
-            "databaseId": selected.database_id,
-            "status": selected.status,
-            "conclusion": selected.conclusion,
-            "createdAt": selected.created_at,
-            "workflowName": selected.workflow_name,
-            "displayTitle": selected.display_title,
-            "htmlUrl": selected.html_url,
-        }
-
-        repo_dir = outdir / sanitize_repo(repo) / f"run_{selected.database_id}"
-        repo_dir.mkdir(parents=True, exist_ok=True)
-
-        write_json(repo_dir / "run_meta.json", item["selected_run"])
-        ok_dl, out_dl = gh_download_run(repo, selected.database_id, repo_dir / "artifacts")
-        write_text(repo_dir / "download.log", out_dl + "\n")
-
-        item["download_ok"] = bool(ok_dl)
-        if not ok_dl:
-            item["error"] = f"download_failed:{out_dl[:2000]}"
-        else:
-            item["error"] = None
-
-        manifest["items"].append(item)
+    with (outdir / ITEMS_FILE).open("wb") as items_fh:
+        asyncio.run(collect(token, plan, args.workflow, args.limit, args.concurrency, items_fh, args.branch))
 
     manifest["utc_end"] = utc_now()
     write_json(outdir / "manifest.json", manifest)
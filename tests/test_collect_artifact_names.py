@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("orjson")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import collect_all_reports as car  # noqa: E402
+
+
+def test_raw_names_are_kept():
+    for name in ("coverage-report", "Test Results (3.11)", "logs:été"):
+        assert car.artifact_dirname(name) == name
+
+
+@pytest.mark.parametrize("name", ["", ".", "..", "a/b", "../x", "a\\b", "a\0b"])
+def test_unsafe_names_are_rejected(name):
+    with pytest.raises(ValueError):
+        car.artifact_dirname(name)
@@ -0,0 +1,94 @@
+import asyncio
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("orjson")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import collect_all_reports as car  # noqa: E402
+
+
+def _run(root: Path, name: str, filters=None) -> Path:
+    d = root / name
+    (d / "artifacts" / "a").mkdir(parents=True)
+    (d / "artifacts" / "a" / "r.json").write_text("{}", encoding="utf-8")
+    if filters is not None:
+        (d / car.DONE_FILE).write_text(json.dumps({"workflow_filters": filters, "files": {}}), encoding="utf-8")
+    return d
+
+
+def test_prune_removes_only_same_workflow(tmp_path):
+    _run(tmp_path, "run_1", ["build"])
+    _run(tmp_path, "run_2", ["docs"])
+    _run(tmp_path, "run_3", ["build"])
+
+    removed = car.prune_stale_runs(tmp_path, "run_3", "build")
+
+    assert removed == ["run_1"]
+    assert not (tmp_path / "run_1").exists()
+    assert (tmp_path / "run_2" / "artifacts" / "a" / "r.json").exists(), "run d'un autre filtre supprimé"
+    assert (tmp_path / "run_3").exists()
+
+
+def test_prune_keeps_run_shared_with_other_filter(tmp_path):
+    shared = _run(tmp_path, "run_1", ["build", "docs"])
+    _run(tmp_path, "run_2", ["docs"])
+
+    assert car.prune_stale_runs(tmp_path, "run_2", "docs") == []
+
+    assert shared.exists()
+    assert json.loads((shared / car.DONE_FILE).read_text(encoding="utf-8"))["workflow_filters"] == ["build"]
+
+
+def test_prune_reclaims_runs_without_owner(tmp_path):
+    _run(tmp_path, "run_1")
+    (tmp_path / "run_2").mkdir()
+    (tmp_path / "run_2" / car.DONE_FILE).write_text("not json", encoding="utf-8")
+    (tmp_path / "notes").mkdir()
+    _run(tmp_path, "run_3", [""])
+
+    assert sorted(car.prune_stale_runs(tmp_path, "run_3", "")) == ["run_1", "run_2"]
+
+    assert {p.name for p in tmp_path.iterdir()} == {"run_3", "notes"}
+
+
+def _zip_bytes() -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("r.json", "{}")
+    return buf.getvalue()
+
+
+def _collect_run(root: Path, run_id: int, archive: bytes) -> dict:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/runs"):
+            run = {"id": run_id, "status": "completed", "conclusion": "success", "name": "CI"}
+            return httpx.Response(200, json={"workflow_runs": [run]})
+        if request.url.path.endswith("/artifacts"):
+            art = {"id": 1, "name": "rep", "archive_download_url": "https://api.github.com/dl/rep"}
+            return httpx.Response(200, json={"artifacts": [art]})
+        return httpx.Response(200, content=archive)
+
+    async def go() -> dict:
+        async with httpx.AsyncClient(base_url=car.API_URL, transport=httpx.MockTransport(handler)) as client:
+            entry = car.RepoPlan(repo="o/r", name="o__r", root=root)
+            return await car.process_repo(client, entry, "ci.yml", 30)
+
+    return asyncio.run(go())
+
+
+def test_failed_download_is_reclaimed_by_next_success(tmp_path):
+    failed = _collect_run(tmp_path, 5, b"not a zip")
+    assert not failed["download_ok"]
+    assert json.loads((tmp_path / "run_5" / car.DONE_FILE).read_text(encoding="utf-8"))["workflow_filters"] == ["ci.yml"]
+    assert not (tmp_path / "run_5" / "artifacts" / "rep.zip").exists()
+
+    assert _collect_run(tmp_path, 6, _zip_bytes())["download_ok"]
+
+    assert {p.name for p in tmp_path.iterdir()} == {"run_6"}
@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("orjson")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import collect_all_reports as car  # noqa: E402
+
+
+def _suite(run_id, created, name="CI", path=".github/workflows/ci.yml", conclusion="SUCCESS"):
+    return {
+        "status": "COMPLETED",
+        "conclusion": conclusion,
+        "workflowRun": {
+            "databaseId": run_id,
+            "createdAt": created,
+            "url": f"u{run_id}",
+            "workflow": {"name": name},
+            "file": {"path": path},
+        },
+    }
+
+
+def _repo(*suites):
+    return {"ref": {"target": {"checkSuites": {"nodes": list(suites)}}}}
+
+
+def _run(run_id, status="completed", conclusion="success"):
+    return car.RunInfo(run_id, status, conclusion, "", None, None, None)
+
+
+def test_workflow_matches_name_path_or_file():
+    path = ".github/workflows/ci.yml"
+    assert car.workflow_matches("", None, None)
+    assert car.workflow_matches("CI", "CI", path)
+    assert car.workflow_matches(path, "CI", path)
+    assert car.workflow_matches("ci.yml", "CI", path)
+    assert not car.workflow_matches("docs.yml", "CI", path)
+    assert not car.workflow_matches("ci.yml", "CI", None)
+
+
+def test_graphql_runs_newest_first_from_workflow_run():
+    data = _repo(_suite(1, "2026-01-01T00:00:00Z"), _suite(2, "2026-01-03T00:00:00Z"), _suite(3, "2026-01-02T00:00:00Z"))
+
+    runs = car.runs_from_graphql(data, "")
+
+    assert [r.database_id for r in runs] == [2, 3, 1]
+    assert runs[0].created_at == "2026-01-03T00:00:00Z"
+    assert (runs[0].status, runs[0].conclusion) == ("completed", "success")
+
+
+def test_graphql_runs_filter_and_skip_suites_without_run():
+    data = _repo(
+        _suite(1, "2026-01-01", name="Docs", path=".github/workflows/docs.yml"),
+        {"status": "COMPLETED", "conclusion": "SUCCESS", "workflowRun": None},
+        None,
+        _suite(2, "2026-01-02"),
+    )
+
+    assert [r.database_id for r in car.runs_from_graphql(data, "CI")] == [2]
+    assert [r.database_id for r in car.runs_from_graphql(data, "docs.yml")] == [1]
+    assert car.runs_from_graphql(None, "") == []
+    assert car.runs_from_graphql({"ref": None}, "") == []
+
+
+def test_pick_run_priority():
+    assert car.pick_run([]) is None
+    running, failed, ok = _run(3, "in_progress", None), _run(2, conclusion="failure"), _run(1)
+    assert car.pick_run([running, failed, ok]) is ok
+    assert car.pick_run([running, failed]) is failed
+    assert car.pick_run([running]) is running
+
+
+def test_pick_run_stops_at_first_success():
+    seen = []
+
+    def runs():
+        for r in (_run(2, conclusion="failure"), _run(1), _run(0)):
+            seen.append(r.database_id)
+            yield r
+
+    assert car.pick_run(runs()).database_id == 1
+    assert seen == [2, 1]
@@ -0,0 +1,66 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("orjson")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import collect_all_reports as car  # noqa: E402
+
+
+def test_retry_delay():
+    assert car.retry_delay(httpx.Response(200)) is None
+    assert car.retry_delay(httpx.Response(404, headers={"retry-after": "5"})) is None
+    assert car.retry_delay(httpx.Response(429, headers={"retry-after": "5"})) == 5.0
+    assert car.retry_delay(httpx.Response(403, headers={"retry-after": "7"})) == 7.0
+    assert car.retry_delay(httpx.Response(429)) == 60.0
+    # 403 sans indication de limite: refus d'accès, pas de reprise.
+    assert car.retry_delay(httpx.Response(403)) is None
+    reset = str(int(time.time()) + 30)
+    delay = car.retry_delay(httpx.Response(403, headers={"x-ratelimit-remaining": "0", "x-ratelimit-reset": reset}))
+    assert 25 <= delay <= 30
+
+
+def test_bucket_paces_after_burst():
+    async def go() -> float:
+        bucket = car.TokenBucket(rate=20, burst=2)
+        t = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - t
+
+    # 2 jetons immédiats, puis 2 à 20/s.
+    assert 0.08 <= asyncio.run(go()) < 0.5
+
+
+def test_back_off_blocks_every_caller():
+    async def go() -> float:
+        bucket = car.TokenBucket(rate=100, burst=10)
+        bucket.back_off(0.2)
+        t = time.monotonic()
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+        return time.monotonic() - t
+
+    assert asyncio.run(go()) >= 0.2
+
+
+def test_transport_stops_after_max_retries(monkeypatch):
+    calls = []
+
+    async def handle(self, request):
+        calls.append(request.url.path)
+        return httpx.Response(429, headers={"retry-after": "0"})
+
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", handle)
+
+    async def go() -> int:
+        transport = car.ThrottledTransport(car.TokenBucket(rate=100, burst=10))
+        async with httpx.AsyncClient(base_url="https://api.github.com", transport=transport) as client:
+            return (await client.get("/x")).status_code
+
+    assert asyncio.run(go()) == 429
+    assert len(calls) == car.API_MAX_RETRIES + 1